@@ -1,5 +1,29 @@
+from array import array
+import bisect
+import heapq
 from banking_system import BankingSystem
 
+#(timestamps key, totals key, sign) of every history that adds to a balance
+BALANCE_HISTORY = (
+    ("deposits_timestamps", "deposits_totals", 1),
+    ("transfers_in_timestamps", "transfers_in_totals", 1),
+    ("transfers_out_timestamps", "transfers_out_totals", -1),
+    ("payments_timestamps", "payments_totals", -1),
+    ("cashbacks_timestamps", "cashbacks_totals", 1),
+)
+
+
+class Cashback:
+    """
+    A scheduled cashback, referenced from the pending heap and from _payments.
+    """
+    __slots__ = ("timestamp", "amount")
+
+    def __init__(self, timestamp: int, amount: int) -> None:
+        self.timestamp = timestamp
+        self.amount = amount
+
+
 class BankingSystemImpl(BankingSystem):
     """
     Implementation for:
@@ -12,9 +36,13 @@ class BankingSystemImpl(BankingSystem):
         # Key: account_id
         # Value: dict { 
         #    "balance": int, 
-        #    "transactions": list, 
+        #    "<history>_timestamps": array, 
+        #    "<history>_totals": list, 
+        #    "children_merges": list, 
         #    "creation_time": int,
-        #    "merged_at": int
+        #    "active": bool,
+        #    "merged_at": int,
+        #    "merged_into": dict
         # }
 
         '''
@@ -26,49 +54,103 @@ class BankingSystemImpl(BankingSystem):
         │
         │ account_info
         │ ├── "balance": int
-        │ └── "transactions": list
-        │        └── transaction dict:
-        │             ├── "timestamp": int
-        │             ├── "operation": str
-        │             ├── "amount": int     
-        |             ├── "payment": str    # only in payback transactions, stores the unique payment number (num_payment) generated in pay()
-        │             └── "deposited": bool     # only in payback transactions, tracks if cashback has deposited or not
+        │ ├── "<history>_timestamps": array  # int64 timestamps of each deposit / transfer_in /
+        │ │                                  # transfer_out / payment / cashback, in time order
+        │ ├── "<history>_totals": list       # running amount totals of the same history, starting at 0,
+        │ │                                  # <history>_totals[i] is the sum of the first i amounts
+        │ ├── "children_merges": list     # (merge timestamp, account_info) of accounts merged into this one
+        │ ├── "active": bool              # False once the account has been merged into another
+        │ ├── "merged_at": int            # only once merged, the merge timestamp
+        │ └── "merged_into": dict         # only once merged, account_info of the account it was merged into
+        │
+        │ cashbacks scheduled by pay() are Cashback:
+        │             ├── timestamp: int    # due time of the cashback
+        │             └── amount: int
+        
+        Every timestamps array is kept sorted so get_balance can binary search
+        the cutoff for `time_at` and read the sum up to it from the matching
+        totals list. A merged account keeps its own history, the surviving
+        account only links to it.
+        Children are linked by account_info rather than id because a merged
+        id can be created again.
         '''
         self.whole_accounts = {}
         self.payment_counter = 1
         self.MILLISECONDS_IN_1_DAY = 86400000
+        # min-heap of scheduled cashbacks:
+        # (due_ts, schedule order, account_info, cashback transaction)
+        self._pending_cashbacks: list = []
+        self._cashback_counter = 0
+        # Key: account_id, Value: running total of outgoing transfers and payments
+        self._outgoing_total: dict[str, int] = {}
+        # Key: payment_id, Value: {"account": account_info that made the payment,
+        #                          "cashback": the Cashback of the payment}
+        self._payments: dict[str, dict] = {}
 
     def _process_cashbacks(self, timestamp: int) -> None:
         """
-        Go through all scheduled cashback transactions stored inside whole_accounts,
-        and deposit any cashback whose due timestamp <= current timestamp,
-        and which has not yet been deposited.
+        Pop every scheduled cashback whose due timestamp <= current timestamp
+        off the heap and deposit it. Each cashback is pushed exactly once, in
+        pay(), so only pending cashbacks are ever visited.
+        Cashbacks of an account that has since been merged go to the account
+        that absorbed it.
+        """
+        pending = self._pending_cashbacks
+        #common case: nothing is due yet
+        if not pending or pending[0][0] > timestamp:
+            return
+        heappop = heapq.heappop
+        find_active = self._find_active
+        while pending and pending[0][0] <= timestamp:
+            _, _, account_info, cashback = heappop(pending)
+            # deposit cashback
+            find_active(account_info)["balance"] += cashback.amount
+
+    def _find_active(self, account_info: dict) -> dict:
+        """
+        Follow the merged_into links from account_info to the active account
+        that currently holds its balance and history.
+        """
+        while not account_info["active"]:
+            account_info = account_info["merged_into"]
+        return account_info
+
+    def _schedule_cashback(self, account_info: dict, cashback: Cashback) -> None:
+        """
+        Push a cashback onto the pending heap, to be deposited into account_info
+        once its timestamp is reached. The counter breaks ties between equal
+        due timestamps so the heap never has to compare accounts.
         """
-        for account_info in self.whole_accounts.values():
-            for transaction in account_info["transactions"]:
-                if (
-                    transaction["operation"] == "cashback"
-                    and transaction["timestamp"] <= timestamp
-                    and transaction["deposited"] is False
-                ):
-                    # deposit cashback
-                    account_info["balance"] += transaction["amount"]
-                    transaction["deposited"] = True
+        self._cashback_counter += 1
+        heapq.heappush(self._pending_cashbacks,
+                       (cashback.timestamp, self._cashback_counter, account_info, cashback))
 
     def create_account(self, timestamp: int, account_id: str) -> bool:
         # If ID exists
         if account_id in self.whole_accounts:
             #if exisiting acount is active and not merged then no creation
-            if "merged_at" not in self.whole_accounts[account_id]:
+            if self.whole_accounts[account_id]["active"]:
                 return False
             # If old account was merged we can create a new account with same ID
 
         #Intializing new account
         self.whole_accounts[account_id] = {
             "balance": 0,
-            "transactions": [],
-            "creation_time": timestamp
+            "deposits_timestamps": array("q"),
+            "transfers_in_timestamps": array("q"),
+            "transfers_out_timestamps": array("q"),
+            "payments_timestamps": array("q"),
+            "cashbacks_timestamps": array("q"),
+            "deposits_totals": [0],
+            "transfers_in_totals": [0],
+            "transfers_out_totals": [0],
+            "payments_totals": [0],
+            "cashbacks_totals": [0],
+            "children_merges": [],
+            "creation_time": timestamp,
+            "active": True
         }
+        self._outgoing_total[account_id] = 0
         return True
 
     def deposit(self, timestamp: int, account_id: str, amount: int) -> int | None:
@@ -89,18 +171,15 @@ class BankingSystemImpl(BankingSystem):
         account = self.whole_accounts[account_id]
 
         #if it is merged then account is not acctive
-        if "merged_at" in account:
+        if not account["active"]:
             return None
 
          #apply deposit to account balance   
         account["balance"] += amount
 
         #record deposity in transaction history for future methods
-        account["transactions"].append({
-            "timestamp": timestamp,
-            "operation": "deposit",
-            "amount": amount
-        })
+        account["deposits_timestamps"].append(timestamp)
+        account["deposits_totals"].append(account["deposits_totals"][-1] + amount)
 
         #return new balance
         return account["balance"]
@@ -126,7 +205,7 @@ class BankingSystemImpl(BankingSystem):
         target = self.whole_accounts[target_account_id]
         
         # Check if either source or target is merged
-        if "merged_at" in source or "merged_at" in target:
+        if not source["active"] or not target["active"]:
             return None
         
         #source should have enough money to do the transfer
@@ -135,22 +214,15 @@ class BankingSystemImpl(BankingSystem):
         
         source["balance"] -= amount
         target["balance"] += amount
+        self._outgoing_total[source_account_id] += amount
         
         #recording outgoing transfer in account history
-        source["transactions"].append({
-            "timestamp": timestamp,
-            "operation": "transfer_out",
-            "amount": amount,
-            "target": target_account_id
-        })
+        source["transfers_out_timestamps"].append(timestamp)
+        source["transfers_out_totals"].append(source["transfers_out_totals"][-1] + amount)
 
         #recording incoming transfer in target account history
-        target["transactions"].append({
-            "timestamp": timestamp,
-            "operation": "transfer_in",
-            "amount": amount,
-            "source": source_account_id
-        })
+        target["transfers_in_timestamps"].append(timestamp)
+        target["transfers_in_totals"].append(target["transfers_in_totals"][-1] + amount)
         
         #return updated balance of source
         return source["balance"]
@@ -170,35 +242,28 @@ class BankingSystemImpl(BankingSystem):
     
         Each entry is formatted as "account_id(amount)".
         """
-        self._process_cashbacks(timestamp)
+        #cashbacks never change outgoing totals, so pending ones are left for later calls
         
         spenders = []
 
-        #iterate over known accounts
-        for acc_id, info in self.whole_accounts.items():
+        #iterate over the running outgoing totals
+        accounts = self.whole_accounts
+        for acc_id, total_outgoing in self._outgoing_total.items():
             # Skip accounts that are merged
-            if "merged_at" in info:
+            if not accounts[acc_id]["active"]:
                 continue
-                
-            total_outgoing = 0
-            #sum the out going money
-            for transac in info["transactions"]:
-                operation = transac["operation"]
-                if operation == "transfer_out" or operation.startswith("payment"):
-                    total_outgoing += transac["amount"]
             #storing so that the largest outgoing is first
             spenders.append((-total_outgoing, acc_id))
             
-        spenders.sort()
+        #partial sort with a size-n heap when only a few accounts are asked for,
+        #a full sort is cheaper once n covers a large part of the accounts
+        if n < len(spenders) // 2:
+            spenders = heapq.nsmallest(n, spenders)
+        else:
+            spenders.sort()
         
         #final list
-        result = []
-        for i in range(min(n, len(spenders))):
-            amt = -spenders[i][0]
-            acc = spenders[i][1]
-            result.append(f"{acc}({amt})")
-            
-        return result
+        return ["%s(%d)" % (acc, -neg_amt) for neg_amt, acc in spenders[:n]]
 
     def pay(self, timestamp: int, account_id: str, amount: int) -> str | None:
         """
@@ -215,7 +280,7 @@ class BankingSystemImpl(BankingSystem):
             return None
             
         account = self.whole_accounts[account_id]
-        if "merged_at" in account:
+        if not account["active"]:
             return None
 
         #enough money in the account to pay   
@@ -228,22 +293,20 @@ class BankingSystemImpl(BankingSystem):
         
         #deducting the payment amount
         account["balance"] -= amount
+        self._outgoing_total[account_id] += amount
         
-        account["transactions"].append({
-            "timestamp": timestamp,
-            "operation": payment_id,
-            "amount": amount
-        })
+        account["payments_timestamps"].append(timestamp)
+        account["payments_totals"].append(account["payments_totals"][-1] + amount)
         
         #cashback happens one day later
-        cashback_amount = int(amount * 0.02)
-        account["transactions"].append({
-            "timestamp": timestamp + self.MILLISECONDS_IN_1_DAY,
-            "operation": "cashback",
-            "amount": cashback_amount,
-            "related_payment": payment_id,
-            "deposited": False
-        })
+        #integer 2%, truncated toward zero like int(amount * 0.02)
+        cashback_amount = amount * 2 // 100 if amount >= 0 else -(-amount * 2 // 100)
+        due_ts = timestamp + self.MILLISECONDS_IN_1_DAY
+        cashback = Cashback(due_ts, cashback_amount)
+        account["cashbacks_timestamps"].append(due_ts)
+        account["cashbacks_totals"].append(account["cashbacks_totals"][-1] + cashback_amount)
+        self._schedule_cashback(account, cashback)
+        self._payments[payment_id] = {"account": account, "cashback": cashback}
         
         return payment_id
 
@@ -256,33 +319,24 @@ class BankingSystemImpl(BankingSystem):
             - "CASHBACK_RECEIVED" 
             - None              
         """
-        self._process_cashbacks(timestamp)
+        #no balance is read here, so due cashbacks are not deposited by this call
         
         #checking if account exists and not merged
         if account_id not in self.whole_accounts:
             return None
             
         account = self.whole_accounts[account_id]
-        if "merged_at" in account:
+        if not account["active"]:
             return None
         
-        # Check transaction history
-        payment_found = False
-        cashback_deposited = False
-        
-        #searching transaction history
-        for transac in account["transactions"]:
-            if transac["operation"] == payment:
-                payment_found = True
-            if (transac["operation"] == "cashback" and 
-                transac.get("related_payment") == payment and 
-                transac["deposited"]):
-                cashback_deposited = True
-                
-        if not payment_found:
+        #payment has to belong to this account
+        payment_entry = self._payments.get(payment)
+        if payment_entry is None or self._find_active(payment_entry["account"]) is not account:
             return None
-        #If cashback was deposited then DONE otherwise still processing  
-        return "CASHBACK_RECEIVED" if cashback_deposited else "IN_PROGRESS"
+        #timestamps never decrease, so once the cashback is due it counts as received
+        if payment_entry["cashback"].timestamp <= timestamp:
+            return "CASHBACK_RECEIVED"
+        return "IN_PROGRESS"
 
     def merge_accounts(self, timestamp: int, account_id_1: str, account_id_2: str) -> bool:
         """
@@ -307,20 +361,19 @@ class BankingSystemImpl(BankingSystem):
         account_2 = self.whole_accounts[account_id_2]
         
         # Cannot merge if either is already merged
-        if "merged_at" in account_1 or "merged_at" in account_2:
+        if not account_1["active"] or not account_2["active"]:
             return False
         
         #move balance from account 1 to account 2
         account_1["balance"] += account_2["balance"]
+        self._outgoing_total[account_id_1] += self._outgoing_total[account_id_2]
         
-        #copy and tag account transation into acocunt 1
-        for transac in account_2["transactions"]:
-            new_transac = transac.copy()
-            new_transac["merged_from"] = account_id_2
-            new_transac["merged_at"] = timestamp
-            account_1["transactions"].append(new_transac)
+        #link account 2 under account 1 instead of copying its history
+        account_1["children_merges"].append((timestamp, account_2))
+        account_2["merged_into"] = account_1
             
         # Delete account 2 so it does not accept new operations
+        account_2["active"] = False
         account_2["merged_at"] = timestamp
         
         return True
@@ -347,34 +400,25 @@ class BankingSystemImpl(BankingSystem):
             return None
             
         #account only exisits for timestamps before the merge
-        if "merged_at" in account:
+        if not account["active"]:
             if time_at >= account["merged_at"]:
                 return None
         
-        #balance calculcated
+        #balance calculcated from the running totals up to time_at,
+        #for the account and every account merged into it at or before time_at
+        bisect_right = bisect.bisect_right
         balance = 0
-        for transac in account["transactions"]:
-            #skipping for future transactions
-            if transac["timestamp"] > time_at:
-                continue
-                
-            #if transaction belonged to another account, count if merge was before or at the time given
-            if "merged_at" in transac:
-                if transac["merged_at"] > time_at:
-                    continue
-            
-            operation = transac["operation"]
-            amount = transac["amount"]
-            
-            if operation == "deposit":
-                balance += amount
-            elif operation == "transfer_in":
-                balance += amount
-            elif operation == "transfer_out":
-                balance -= amount
-            elif operation.startswith("payment"):
-                balance -= amount
-            elif operation == "cashback":
-                balance += amount
+        stack = [account]
+        while stack:
+            info = stack.pop()
+            for timestamps_key, totals_key, sign in BALANCE_HISTORY:
+                cut = bisect_right(info[timestamps_key], time_at)
+                balance += sign * info[totals_key][cut]
+
+            #children are appended in merge order
+            for merged_at, child in info["children_merges"]:
+                if merged_at > time_at:
+                    break
+                stack.append(child)
                 
         return balance
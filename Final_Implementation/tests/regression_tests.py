@@ -0,0 +1,51 @@
+import unittest
+from banking_system_impl import BankingSystemImpl
+
+
+class RegressionTests(unittest.TestCase):
+    """
+    Regression tests for bugs found in BankingSystemImpl.
+    These are not part of the graded level tests.
+    """
+
+    failureException = Exception
+
+
+    @classmethod
+    def setUp(cls):
+        cls.system = BankingSystemImpl()
+
+    def test_merge_recreated_account_with_pending_cashback(self):
+        self.assertTrue(self.system.create_account(1, 'account1'))
+        self.assertTrue(self.system.create_account(2, 'account2'))
+        self.assertTrue(self.system.create_account(3, 'account3'))
+        self.assertEqual(self.system.deposit(4, 'account1', 1000), 1000)
+        self.assertEqual(self.system.pay(5, 'account1', 100), 'payment1')
+        self.assertTrue(self.system.merge_accounts(6, 'account2', 'account1'))
+        self.assertTrue(self.system.merge_accounts(7, 'account3', 'account2'))
+        self.assertTrue(self.system.create_account(8, 'account2'))
+        self.assertTrue(self.system.merge_accounts(9, 'account2', 'account3'))
+        self.assertEqual(self.system.get_payment_status(10, 'account2', 'payment1'), 'IN_PROGRESS')
+        self.assertEqual(self.system.get_balance(86400005, 'account2', 86400005), 902)
+        self.assertEqual(self.system.get_payment_status(86400006, 'account2', 'payment1'), 'CASHBACK_RECEIVED')
+        self.assertEqual(self.system.deposit(86400007, 'account2', 8), 910)
+
+    def test_amounts_beyond_int64(self):
+        self.assertTrue(self.system.create_account(1, 'account1'))
+        self.assertTrue(self.system.create_account(2, 'account2'))
+        self.assertEqual(self.system.deposit(3, 'account1', 2 ** 63), 2 ** 63)
+        self.assertEqual(self.system.transfer(4, 'account1', 'account2', 2 ** 62), 2 ** 62)
+        self.assertEqual(self.system.deposit(5, 'account2', 2 ** 63), 2 ** 63 + 2 ** 62)
+        self.assertEqual(self.system.pay(6, 'account2', 2 ** 63), 'payment1')
+        self.assertEqual(self.system.top_spenders(7, 2), ['account2(%d)' % 2 ** 63, 'account1(%d)' % 2 ** 62])
+        self.assertEqual(self.system.get_balance(8, 'account1', 3), 2 ** 63)
+        self.assertEqual(self.system.get_balance(9, 'account2', 9), 2 ** 62)
+        self.assertTrue(self.system.merge_accounts(10, 'account1', 'account2'))
+        self.assertEqual(self.system.get_balance(86400006, 'account1', 86400006), 2 ** 63 + 2 ** 63 * 2 // 100)
+
+    def test_negative_payment_cashback_truncates_toward_zero(self):
+        self.assertTrue(self.system.create_account(1, 'account1'))
+        self.assertEqual(self.system.deposit(2, 'account1', 1000), 1000)
+        self.assertEqual(self.system.pay(5, 'account1', -149), 'payment1')
+        self.assertEqual(self.system.get_balance(86400006, 'account1', 86400006), 1147)
+        self.assertEqual(self.system.deposit(86400007, 'account1', 3), 1150)